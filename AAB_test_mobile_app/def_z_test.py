@@ -1,40 +1,47 @@
-import math as mth
-import scipy.stats as st
+import numpy as np
+from scipy.special import ndtr
 
-def z_test(group1, group2, alpha, event_group, user_group):
+def z_test_p_values(e1, e2, u1, u2):
     """
-    Функция принимает на вход названия групп, уровень значимости, данные о событиях и количество пользователей.
-    Проверяет статистическую значимость разницы между долями успехов в группах с помощью Z-теста.
+    Функция принимает на вход массивы количества успехов в двух группах и размеры групп.
+    Возвращает массив P-value Z-теста для разницы долей по каждому элементу массивов.
     """
-    print('Проверка групп:', group1, 'и', group2)
-    print('при уровне значимости: {:.0%}'.format(alpha))
+    # пропорции успехов в первой и во второй группе:
+    p1 = e1 / u1
+    p2 = e2 / u2
 
-    for i in event_group.index:
-        # пропорция успехов в первой группе:
-        p1 = event_group[group1][i] / user_group[group1]
+    # пропорция успехов в комбинированном датасете:
+    p_combined = (e1 + e2) / (u1 + u2)
 
-        # пропорция успехов во второй группе:
-        p2 = event_group[group2][i] / user_group[group2]
+    # разница пропорций в датасетах:
+    difference = p1 - p2
 
-        # пропорция успехов в комбинированном датасете:
-        p_combined = (event_group[group1][i] + event_group[group2][i]) / (user_group[group1] + user_group[group2])
+    # считаем статистику Z
+    z_value = difference / np.sqrt(p_combined * (1 - p_combined) * (1 / u1 + 1 / u2))
 
-        # разница пропорций в датасетах:
-        difference = p1 - p2
+    # расчет P-value по функции распределения стандартного нормального распределения
+    return (1 - ndtr(np.abs(z_value))) * 2
 
-        # считаем статистику Z
-        z_value = (difference / mth.sqrt(p_combined * (1 - p_combined) *
-                    (1 / user_group[group1] + 1 / user_group[group2])))
+def z_test(group1, group2, alpha, event_group, user_group):
+    """
+    Функция принимает на вход названия групп, уровень значимости, данные о событиях и количество пользователей.
+    Проверяет статистическую значимость разницы между долями успехов в группах с помощью Z-теста.
+    """
+    print('Проверка групп:', group1, 'и', group2)
+    print('при уровне значимости: {:.0%}'.format(alpha))
 
-        # задаем стандартное нормальное распределение
-        distr = st.norm(0, 1)
+    # количество успехов и пользователей в группах
+    e1 = event_group[group1].to_numpy(dtype=np.float64)
+    e2 = event_group[group2].to_numpy(dtype=np.float64)
+    u1, u2 = user_group[group1], user_group[group2]
 
-        # расчет P-value
-        p_value = (1 - distr.cdf(abs(z_value))) * 2
+    # считаем P-value сразу для всех событий
+    p_values = z_test_p_values(e1, e2, u1, u2)
 
+    for event, p_value in zip(event_group['event'].to_numpy(), p_values):
         print('--------------------------------')
         print()
-        print('Событие >', event_group['event'][i])
+        print('Событие >', event)
         print()
         print('Уровень P-value:', p_value)
 
@@ -42,5 +49,5 @@ def z_test(group1, group2, alpha, event_group, user_group):
             print("Разница между тест группами есть")
         else:
             print("Разницы между тест группами нет")
-            
+
         print()
@@ -0,0 +1,194 @@
+import pandas as pd
+import numpy as np
+
+def get_lifetime(event_ts: pd.Series, first_ts: pd.Series) -> np.ndarray:
+    """
+    Рассчитывает лайфтайм события — число полных дней от первого посещения пользователя.
+
+    Параметры:
+    ----------
+    event_ts : pd.Series
+        Дата и время события (покупки или сессии).
+    first_ts : pd.Series
+        Дата и время первого посещения пользователя.
+
+    Возвращает:
+    ----------
+    np.ndarray
+        Лайфтаймы в типе int32; если у части строк нет события, лайфтайм
+        для них — пропуск, а массив имеет тип float32, как и у .dt.days.
+    """
+    # делим разницу дат на длину суток в целочисленном представлении
+    time_diff = event_ts.to_numpy() - first_ts.to_numpy()
+    ticks_per_day = np.timedelta64(1, 'D') // np.timedelta64(
+        1, np.datetime_data(time_diff.dtype)[0]
+    )
+    lifetime = time_diff.view('i8') // ticks_per_day
+    is_missing = np.isnat(time_diff)
+    if is_missing.any():
+        return np.where(is_missing, np.nan, lifetime).astype('float32')
+    return lifetime.astype('int32')
+
+def get_in_horizon(
+    df: pd.DataFrame,
+    horizon_days: int,
+    clip_negative: bool = False
+) -> pd.DataFrame:
+    """
+    Оставляет строки с лайфтаймом внутри горизонта анализа.
+
+    Параметры:
+    ----------
+    df : pd.DataFrame
+        Сырые данные со столбцом 'lifetime'.
+    horizon_days : int
+        Количество дней горизонта анализа.
+    clip_negative : bool, по умолчанию False
+        Если True, отрицательные лайфтаймы (события раньше первого посещения)
+        приравниваются к нулевому дню.
+
+    Возвращает:
+    ----------
+    pd.DataFrame
+        Строки с лайфтаймом меньше horizon_days.
+    """
+    if not clip_negative:
+        return df[df['lifetime'] < horizon_days]
+    lifetime = df['lifetime'].clip(lower=0)
+    return df[lifetime < horizon_days].assign(lifetime=lifetime)
+
+def count_users_by_lifetime(
+    df: pd.DataFrame,
+    dims: list,
+    horizon_days: int,
+    clip_negative: bool = False
+) -> tuple:
+    """
+    Считает уникальных пользователей в каждый день лайфтайма и размеры когорт
+    по самым детальным признакам: таблицы для более крупных группировок
+    получаются из них суммированием в get_cohort_rates.
+
+    Параметры:
+    ----------
+    df : pd.DataFrame
+        Сырые данные со столбцами 'user_id', 'lifetime' и признаками из dims.
+    dims : list
+        Признаки группировки.
+    horizon_days : int
+        Количество дней горизонта анализа.
+    clip_negative : bool, по умолчанию False
+        Если True, события раньше первого посещения относятся к нулевому дню.
+
+    Возвращает:
+    ----------
+    tuple
+        Таблица числа пользователей (столбцы — лайфтаймы от 0 до horizon_days - 1)
+        и таблица размеров когорт со столбцом 'cohort_size'.
+    """
+    # число уникальных пользователей в каждый лайфтайм: после удаления
+    # повторов это просто размер группы, пропуски сразу заполняем нулями
+    result = (
+        get_in_horizon(df, horizon_days, clip_negative)[dims + ['lifetime', 'user_id']]
+        .drop_duplicates()
+        .groupby(dims + ['lifetime'], observed=True)
+        .size()
+        .unstack('lifetime', fill_value=0)
+        .reindex(columns=range(horizon_days), fill_value=0)
+    )
+    # размеры когорт: каждый пользователь относится к одной когорте,
+    # поэтому после удаления повторов достаточно посчитать строки
+    cohort_sizes = (
+        df.drop_duplicates('user_id')
+        .groupby(dims, observed=True)
+        .size()
+        .to_frame('cohort_size')
+    )
+    return result, cohort_sizes
+
+def get_cohort_rates(
+    result: pd.DataFrame,
+    cohort_sizes: pd.DataFrame,
+    dims: list,
+    horizon_days: int,
+    cumulative: bool = False
+) -> pd.DataFrame:
+    """
+    Суммирует детальные таблицы до желаемых признаков и делит значения
+    каждого лайфтайма на размер когорты.
+
+    Параметры:
+    ----------
+    result : pd.DataFrame
+        Детальная таблица значений по лайфтаймам.
+    cohort_sizes : pd.DataFrame
+        Детальная таблица размеров когорт со столбцом 'cohort_size'.
+    dims : list
+        Признаки, до которых суммируются таблицы.
+    horizon_days : int
+        Количество дней горизонта анализа.
+    cumulative : bool, по умолчанию False
+        Если True, значения по лайфтаймам накапливаются.
+
+    Возвращает:
+    ----------
+    pd.DataFrame
+        Таблица с размером когорты в первом столбце и horizon_days лайфтаймами.
+    """
+    # каждый пользователь относится ровно к одной дате привлечения,
+    # поэтому суммы детальных таблиц не считают пользователей дважды
+    result = result.groupby(level=dims, observed=True).sum()
+    cohort_sizes = cohort_sizes.groupby(level=dims, observed=True).sum()
+    if cumulative:
+        result = result.cumsum(axis=1)
+    result = cohort_sizes.merge(result, on=dims, how='left').fillna(0)
+    # делим каждую «ячейку» в строке на размер когорты
+    result = result.div(result['cohort_size'], axis=0)
+    # размер когорты стоит первым, за ним ровно horizon_days лайфтаймов
+    result = result.iloc[:, :horizon_days + 1]
+    result['cohort_size'] = cohort_sizes
+    return result
+
+def unstack_history(history: pd.DataFrame, value) -> pd.DataFrame:
+    """
+    Разворачивает таблицу динамики: строками становятся даты привлечения,
+    столбцами — все остальные уровни индекса.
+
+    Параметры:
+    ----------
+    history : pd.DataFrame
+        Таблица динамики с датой привлечения 'dt' в индексе.
+    value
+        Столбец таблицы динамики, значения которого нужно развернуть.
+
+    Возвращает:
+    ----------
+    pd.DataFrame
+        Развёрнутая таблица значений столбца value.
+    """
+    # каждая пара (признаки, дата) встречается в таблице динамики один раз,
+    # поэтому вместо сводной таблицы достаточно развернуть индекс
+    columns = [name for name in history.index.names if name not in ['dt']]
+    if not columns:
+        return history[[value]]
+    return history[value].unstack(columns)
+
+def set_line_labels(lines: list, names) -> None:
+    """
+    Подписывает линии графика названиями строк или столбцов таблицы:
+    составные названия записываются так же, как в легендах pandas.
+
+    Параметры:
+    ----------
+    lines : list
+        Линии, которые вернул ax.plot, по одной на строку или столбец таблицы.
+    names
+        Названия строк или столбцов таблицы в порядке линий.
+
+    Возвращает:
+    ----------
+    None
+    """
+    for line, name in zip(lines, names):
+        if isinstance(name, tuple):
+            name = '({})'.format(', '.join(map(str, name)))
+        line.set_label(str(name))
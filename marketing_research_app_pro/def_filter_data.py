@@ -18,7 +18,5 @@ def filter_data(df: pd.DataFrame, window: int) -> pd.DataFrame:
         Датафрейм с теми же столбцами, но с примененным сглаживанием. Значения в каждом столбце заменяются на
         скользящее среднее с указанным размером окна.
     """
-    # для каждого столбца применяем скользящее среднее
-    for column in df.columns.values:
-        df[column] = df[column].rolling(window).mean() 
-    return df
\ No newline at end of file
+    # применяем скользящее среднее сразу ко всем столбцам
+    return df.rolling(window).mean()
\ No newline at end of file
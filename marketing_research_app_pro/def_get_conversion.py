@@ -1,5 +1,6 @@
 from datetime import timedelta
 import pandas as pd
+from def_cohort_tables import get_lifetime, count_users_by_lifetime, get_cohort_rates
 
 def get_conversion(
     profiles: pd.DataFrame, 
@@ -38,60 +39,51 @@ def get_conversion(
         last_suitable_acquisition_date = observation_date - timedelta(
             days=horizon_days - 1
         )
-    result_raw = profiles.query('dt <= @last_suitable_acquisition_date')
+    result_raw = profiles[
+        profiles['dt'].to_numpy() <= last_suitable_acquisition_date
+    ]
+
+    # оставляем покупки только отобранных пользователей
+    # и приводим идентификаторы к типу из профилей
+    purchases = purchases.loc[
+        purchases['user_id'].isin(result_raw['user_id']), ['user_id', 'event_dt']
+    ].astype({'user_id': result_raw['user_id'].dtype})
 
     # определяем дату и время первой покупки для каждого пользователя
-    first_purchases = (
-        purchases.sort_values(by=['user_id', 'event_dt'])
-        .groupby('user_id')
-        .agg({'event_dt': 'first'})
-        .reset_index()
-    )
+    first_purchases = purchases.groupby('user_id', sort=False)['event_dt'].min()
 
     # добавляем данные о покупках в профили
-    result_raw = result_raw.merge(
-        first_purchases[['user_id', 'event_dt']], on='user_id', how='left'
+    result_raw = result_raw.assign(
+        event_dt=result_raw['user_id'].map(first_purchases)
     )
 
-    # рассчитываем лайфтайм для каждой покупки
-    result_raw['lifetime'] = (
-        result_raw['event_dt'] - result_raw['first_ts']
-    ).dt.days
+    # рассчитываем лайфтайм для каждой покупки, без покупки лайфтайм — пропуск
+    result_raw['lifetime'] = get_lifetime(result_raw['event_dt'], result_raw['first_ts'])
 
     # группируем по cohort, если в dimensions ничего нет
     if len(dimensions) == 0:
-        result_raw['cohort'] = 'All users' 
+        result_raw['cohort'] = pd.Categorical(['All users'] * len(result_raw))
         dimensions = dimensions + ['cohort']
 
-    # функция для группировки таблицы по желаемым признакам
-    def group_by_dimensions(df, dims, horizon_days):
-        result = df.pivot_table(
-            index=dims, columns='lifetime', values='user_id', aggfunc='nunique'
-        )
-        result = result.fillna(0).cumsum(axis = 1)
-        cohort_sizes = (
-            df.groupby(dims)
-            .agg({'user_id': 'nunique'})
-            .rename(columns={'user_id': 'cohort_size'})
-        )
-        result = cohort_sizes.merge(result, on=dims, how='left').fillna(0)
-        # делим каждую «ячейку» в строке на размер когорты
-        # и получаем conversion rate
-        result = result.div(result['cohort_size'], axis=0)
-        result = result[['cohort_size'] + list(range(horizon_days))]
-        result['cohort_size'] = cohort_sizes
-        return result
+    # один раз группируем данные по всем признакам и дате привлечения
+    # покупки раньше первого визита в накопленной сумме
+    # равносильны покупкам в нулевой день
+    result_fine, cohort_sizes = count_users_by_lifetime(
+        result_raw, dimensions + ['dt'], horizon_days, clip_negative=True
+    )
 
     # получаем таблицу конверсии
-    result_grouped = group_by_dimensions(result_raw, dimensions, horizon_days)
+    result_grouped = get_cohort_rates(
+        result_fine, cohort_sizes, dimensions, horizon_days, cumulative=True
+    )
 
     # для таблицы динамики конверсии убираем 'cohort' из dimensions
     if 'cohort' in dimensions: 
         dimensions = []
 
     # получаем таблицу динамики конверсии
-    result_in_time = group_by_dimensions(
-        result_raw, dimensions + ['dt'], horizon_days
+    result_in_time = get_cohort_rates(
+        result_fine, cohort_sizes, dimensions + ['dt'], horizon_days, cumulative=True
     )
 
     # возвращаем обе таблицы и сырые данные
@@ -2,6 +2,7 @@ from typing import List, Tuple
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
+from def_cohort_tables import get_lifetime, get_in_horizon, get_cohort_rates
 
 def get_ltv(
     profiles: pd.DataFrame,
@@ -63,53 +64,62 @@ def get_ltv(
         last_suitable_acquisition_date = observation_date - timedelta(
             days=horizon_days - 1
         )
-    result_raw = profiles.query('dt <= @last_suitable_acquisition_date')
-    # добавляем данные о покупках в профили
-    result_raw = result_raw.merge(
-        purchases[['user_id', 'event_dt', 'revenue']], on='user_id', how='left'
-    )
-    # рассчитываем лайфтайм пользователя для каждой покупки
-    result_raw['lifetime'] = (
-        result_raw['event_dt'] - result_raw['first_ts']
-    ).dt.days
+    result_raw = profiles[
+        profiles['dt'].to_numpy() <= last_suitable_acquisition_date
+    ]
+    # добавляем данные о покупках отобранных пользователей в профили
+    # с идентификаторами того же типа, что и в профилях
+    purchases = purchases.loc[
+        purchases['user_id'].isin(result_raw['user_id']),
+        ['user_id', 'event_dt', 'revenue'],
+    ].astype({'user_id': result_raw['user_id'].dtype})
+    result_raw = result_raw.merge(purchases, on='user_id', how='left')
+    # рассчитываем лайфтайм пользователя для каждой покупки, без покупки — пропуск
+    result_raw['lifetime'] = get_lifetime(result_raw['event_dt'], result_raw['first_ts'])
     # группируем по cohort, если в dimensions ничего нет
     if len(dimensions) == 0:
-        result_raw['cohort'] = 'All users'
+        result_raw['cohort'] = pd.Categorical(['All users'] * len(result_raw))
         dimensions = dimensions + ['cohort']
 
-    # функция группировки по желаемым признакам
+    # функция группировки по самым детальным признакам:
+    # таблицы для более крупных группировок получаются из неё суммированием
     def group_by_dimensions(df, dims, horizon_days):
+        # покупки раньше первого визита в накопленной сумме
+        # равносильны покупкам в нулевой день
+        in_horizon = get_in_horizon(df, horizon_days, clip_negative=True)
         # строим «треугольную» таблицу выручки
-        result = df.pivot_table(
-            index=dims, columns='lifetime', values='revenue', aggfunc='sum'
+        revenue = (
+            in_horizon.groupby(dims + ['lifetime'], observed=True)['revenue']
+            .sum()
+            .unstack('lifetime', fill_value=0)
+            .reindex(columns=range(horizon_days), fill_value=0)
+        )
+        # у каждого пользователя одна когорта и одна стоимость привлечения,
+        # поэтому размеры когорт и суммарные затраты на привлечение
+        # считаем за один проход по одной строке на пользователя
+        users = (
+            df.drop_duplicates('user_id')
+            .groupby(dims, observed=True)
+            .agg(
+                cohort_size=('user_id', 'size'),
+                acquisition_cost=('acquisition_cost', 'sum'),
+            )
         )
-        # находим сумму выручки с накоплением
-        result = result.fillna(0).cumsum(axis=1)
-        # вычисляем размеры когорт
-        cohort_sizes = (
-            df.groupby(dims)
-            .agg({'user_id': 'nunique'})
-            .rename(columns={'user_id': 'cohort_size'})
+        cohort_sizes = users[['cohort_size']]
+        costs = users[['acquisition_cost']]
+        return revenue, cohort_sizes, costs
+
+    # функция расчёта LTV и ROI по желаемым признакам
+    def get_ltv_roi(revenue, cohort_sizes, costs, dims, horizon_days):
+        # считаем LTV: накопленную выручку делим на размер когорты
+        result = get_cohort_rates(
+            revenue, cohort_sizes, dims, horizon_days, cumulative=True
         )
-        # объединяем размеры когорт и таблицу выручки
-        result = cohort_sizes.merge(result, on=dims, how='left').fillna(0)
-        # считаем LTV: делим каждую «ячейку» в строке на размер когорты
-        result = result.div(result['cohort_size'], axis=0)
-        # исключаем все лайфтаймы, превышающие горизонт анализа
-        result = result[['cohort_size'] + list(range(horizon_days))]
-        # восстанавливаем размеры когорт
-        result['cohort_size'] = cohort_sizes
-
-        # собираем датафрейм с данными пользователей и значениями CAC, 
-        # добавляя параметры из dimensions
-        cac = df[['user_id', 'acquisition_cost'] + dims].drop_duplicates()
+        cohort_sizes = result['cohort_size']
 
         # считаем средний CAC по параметрам из dimensions
-        cac = (
-            cac.groupby(dims)
-            .agg({'acquisition_cost': 'mean'})
-            .rename(columns={'acquisition_cost': 'cac'})
-        )
+        costs = costs.groupby(level=dims, observed=True).sum()
+        cac = costs['acquisition_cost'].div(cohort_sizes).to_frame('cac')
 
         # считаем ROI: делим LTV на CAC
         roi = result.div(cac['cac'], axis=0)
@@ -120,19 +130,20 @@ def get_ltv(
         # восстанавливаем размеры когорт в таблице ROI
         roi['cohort_size'] = cohort_sizes
 
-        # добавляем CAC в таблицу ROI
-        roi['cac'] = cac['cac']
-
-        # в финальной таблице оставляем размеры когорт, CAC
-        # и ROI в лайфтаймы, не превышающие горизонт анализа
-        roi = roi[['cohort_size', 'cac'] + list(range(horizon_days))]
+        # добавляем CAC в таблицу ROI сразу после размеров когорт
+        roi.insert(1, 'cac', cac['cac'])
 
         # возвращаем таблицы LTV и ROI
         return result, roi
 
+    # один раз группируем данные по всем признакам и дате привлечения
+    revenue, cohort_sizes, costs = group_by_dimensions(
+        result_raw, dimensions + ['dt'], horizon_days
+    )
+
     # получаем таблицы LTV и ROI
-    result_grouped, roi_grouped = group_by_dimensions(
-        result_raw, dimensions, horizon_days
+    result_grouped, roi_grouped = get_ltv_roi(
+        revenue, cohort_sizes, costs, dimensions, horizon_days
     )
 
     # для таблиц динамики убираем 'cohort' из dimensions
@@ -140,8 +151,8 @@ def get_ltv(
         dimensions = []
 
     # получаем таблицы динамики LTV и ROI
-    result_in_time, roi_in_time = group_by_dimensions(
-        result_raw, dimensions + ['dt'], horizon_days
+    result_in_time, roi_in_time = get_ltv_roi(
+        revenue, cohort_sizes, costs, dimensions + ['dt'], horizon_days
     )
 
     return (
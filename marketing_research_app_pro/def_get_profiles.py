@@ -23,22 +23,28 @@ def get_profiles(visits: pd.DataFrame, orders: pd.DataFrame, ad_costs: pd.DataFr
                   и информацию о стоимости привлечения.
     """
 
-    # находим параметры первых посещений
+    # находим параметры первых посещений: позиции строк с минимальным
+    # временем начала сессии для каждого пользователя; берём именно позиции,
+    # а не метки индекса, которые в visits могут повторяться; группы
+    # упорядочены по user_id, поэтому профили идут в порядке идентификаторов
+    first_visits = (
+        visits['session_start']
+        .reset_index(drop=True)
+        .groupby(visits['user_id'].to_numpy())
+        .idxmin()
+    )
     profiles = (
-        visits.sort_values(by=['user_id', 'session_start'])
-        .groupby('user_id')
-        .agg(
-            {
-                'session_start': 'first',
-                'channel': 'first',
-                'device': 'first',
-                'region': 'first',
-            }
-        )
+        visits.iloc[first_visits.to_numpy()][
+            ['user_id', 'session_start', 'channel', 'device', 'region']
+        ]
         .rename(columns={'session_start': 'first_ts'})
-        .reset_index()
+        .reset_index(drop=True)
     )
 
+    # храним идентификаторы в наименьшем подходящем целочисленном типе,
+    # чтобы ускорить объединения с покупками и сессиями
+    profiles['user_id'] = pd.to_numeric(profiles['user_id'], downcast='integer')
+
     # для когортного анализа определяем дату первого посещения
     # и первый день месяца, в который это посещение произошло
     profiles['first_ts'] = pd.to_datetime(profiles['first_ts'])
@@ -46,7 +52,8 @@ def get_profiles(visits: pd.DataFrame, orders: pd.DataFrame, ad_costs: pd.DataFr
     profiles['month'] = profiles['first_ts'].dt.month  
 
     # добавляем признак платящих пользователей
-    profiles['payer'] = profiles['user_id'].isin(orders['user_id'].unique())
+    payer_ids = pd.Index(orders['user_id'].drop_duplicates())
+    profiles['payer'] = profiles['user_id'].isin(payer_ids)
 
     # считаем количество уникальных пользователей
     # с одинаковыми источником и датой привлечения
@@ -74,4 +81,9 @@ def get_profiles(visits: pd.DataFrame, orders: pd.DataFrame, ad_costs: pd.DataFr
     # стоимость привлечения органических пользователей равна нулю
     profiles['acquisition_cost'] = profiles['acquisition_cost'].fillna(0)
 
+    # признаки с небольшим числом значений храним как категории,
+    # чтобы ускорить группировки в последующих расчётах
+    for column in ['channel', 'device', 'region']:
+        profiles[column] = profiles[column].astype('category')
+
     return profiles
\ No newline at end of file
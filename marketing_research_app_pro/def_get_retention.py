@@ -1,5 +1,6 @@
 from datetime import timedelta
 import pandas as pd
+from def_cohort_tables import get_lifetime, count_users_by_lifetime, get_cohort_rates
 
 def get_retention(
     profiles: pd.DataFrame, 
@@ -40,38 +41,36 @@ def get_retention(
         last_suitable_acquisition_date = observation_date - timedelta(
             days=horizon_days - 1
         )
-    result_raw = profiles.query('dt <= @last_suitable_acquisition_date')
+    result_raw = profiles[
+        profiles['dt'].to_numpy() <= last_suitable_acquisition_date
+    ]
 
     # собираем «сырые» данные для расчёта удержания
-    result_raw = result_raw.merge(
-        sessions[['user_id', 'session_start']], on='user_id', how='left'
+    # по сессиям только отобранных пользователей
+    # с идентификаторами того же типа, что и в профилях
+    sessions = sessions.loc[
+        sessions['user_id'].isin(result_raw['user_id']),
+        ['user_id', 'session_start'],
+    ].astype({'user_id': result_raw['user_id'].dtype})
+    result_raw = result_raw.merge(sessions, on='user_id', how='left')
+    # рассчитываем лайфтайм для каждой сессии
+    result_raw['lifetime'] = get_lifetime(
+        result_raw['session_start'], result_raw['first_ts']
     )
-    result_raw['lifetime'] = (
-        result_raw['session_start'] - result_raw['first_ts']
-    ).dt.days
 
-    # функция для группировки таблицы по желаемым признакам
-    def group_by_dimensions(df, dims, horizon_days):
-        result = df.pivot_table(
-            index=dims, columns='lifetime', values='user_id', aggfunc='nunique'
-        )
-        cohort_sizes = (
-            df.groupby(dims)
-            .agg({'user_id': 'nunique'})
-            .rename(columns={'user_id': 'cohort_size'})
-        )
-        result = cohort_sizes.merge(result, on=dims, how='left').fillna(0)
-        result = result.div(result['cohort_size'], axis=0)
-        result = result[['cohort_size'] + list(range(horizon_days))]
-        result['cohort_size'] = cohort_sizes
-        return result
+    # один раз группируем данные по всем признакам и дате привлечения
+    result_fine, cohort_sizes = count_users_by_lifetime(
+        result_raw, dimensions + ['dt'], horizon_days
+    )
 
     # получаем таблицу удержания
-    result_grouped = group_by_dimensions(result_raw, dimensions, horizon_days)
+    result_grouped = get_cohort_rates(
+        result_fine, cohort_sizes, dimensions, horizon_days
+    )
 
     # получаем таблицу динамики удержания
-    result_in_time = group_by_dimensions(
-        result_raw, dimensions + ['dt'], horizon_days
+    result_in_time = get_cohort_rates(
+        result_fine, cohort_sizes, dimensions + ['dt'], horizon_days
     )
 
     # возвращаем обе таблицы и сырые данные
@@ -1,6 +1,7 @@
 import matplotlib.pyplot as plt
 import pandas as pd
 from def_filter_data import filter_data
+from def_cohort_tables import unstack_history
 
 def plot_conversion(
     conversion: pd.DataFrame,
@@ -49,13 +50,8 @@ def plot_conversion(
 
     # второй график — динамика конверсии
     ax2 = plt.subplot(1, 2, 2, sharey=ax1)
-    columns = [
-        # столбцами сводной таблицы станут все столбцы индекса, кроме даты
-        name for name in conversion_history.index.names if name not in ['dt']
-    ]
-    filtered_data = conversion_history.pivot_table(
-        index='dt', columns=columns, values=horizon - 1, aggfunc='mean'
-    )
+    # разворачиваем таблицу динамики: столбцами станут все признаки, кроме даты
+    filtered_data = unstack_history(conversion_history, horizon - 1)
     filter_data(filtered_data, window).plot(grid=True, ax=ax2)
     plt.xlabel('Дата привлечения')
     plt.title('Динамика конверсии пользователей на {}-й день'.format(horizon))
@@ -1,6 +1,7 @@
 import matplotlib.pyplot as plt
 import pandas as pd
 from def_filter_data import filter_data
+from def_cohort_tables import unstack_history, set_line_labels
 
 def plot_ltv_roi(
     ltv: pd.DataFrame,
@@ -40,6 +41,17 @@ def plot_ltv_roi(
         Функция не возвращает значения. Она отображает графики LTV, динамики LTV, 
         динамики стоимости привлечения (CAC), ROI, а также динамики ROI.
     """
+    # функция рисует каждый столбец таблицы отдельной линией
+    # одним вызовом ax.plot, минуя обёртку DataFrame.plot
+    def plot_columns(data, ax):
+        set_line_labels(ax.plot(data.index, data.to_numpy()), data.columns)
+        ax.grid(True)
+        # как и pandas, подписываем легенду названиями уровней столбцов
+        title = None
+        if any(level is not None for level in data.columns.names):
+            title = ','.join(map(str, data.columns.names))
+        ax.legend(title=title)
+
     # задаём сетку отрисовки графиков
     plt.figure(figsize=(20, 10))
 
@@ -58,38 +70,47 @@ def plot_ltv_roi(
         [horizon - 1]
     ]
 
+    # разворачиваем таблицы динамики и сглаживаем их за один проход
+    # скользящего среднего; cac и roi получены из одной таблицы и имеют
+    # одинаковые даты, а ltv присоединяем, только если даты совпадают,
+    # иначе окна скользящего среднего сместились бы
+    ltv_data = unstack_history(ltv_history, horizon - 1)
+    histories = {
+        'cac': unstack_history(cac_history, 'cac'),
+        'roi': unstack_history(roi_history, horizon - 1),
+    }
+    if ltv_data.index.equals(histories['roi'].index):
+        histories['ltv'] = ltv_data
+    else:
+        ltv_data = filter_data(ltv_data, window)
+    smoothed = filter_data(
+        pd.concat(histories.values(), axis=1, keys=histories.keys()), window
+    )
+    if 'ltv' in histories:
+        ltv_data = smoothed['ltv']
+
     # первый график — кривые ltv
     ax1 = plt.subplot(2, 3, 1)
-    ltv.T.plot(grid=True, ax=ax1)
+    plot_columns(ltv.T, ax1)
     plt.legend()
     plt.xlabel('Лайфтайм')
     plt.title('LTV')
 
     # второй график — динамика ltv
     ax2 = plt.subplot(2, 3, 2, sharey=ax1)
-    # столбцами сводной таблицы станут все столбцы индекса, кроме даты
-    columns = [name for name in ltv_history.index.names if name not in ['dt']]
-    filtered_data = ltv_history.pivot_table(
-        index='dt', columns=columns, values=horizon - 1, aggfunc='mean'
-    )
-    filter_data(filtered_data, window).plot(grid=True, ax=ax2)
+    plot_columns(ltv_data, ax2)
     plt.xlabel('Дата привлечения')
     plt.title('Динамика LTV пользователей на {}-й день'.format(horizon))
 
     # третий график — динамика cac
     ax3 = plt.subplot(2, 3, 3, sharey=ax1)
-    # столбцами сводной таблицы станут все столбцы индекса, кроме даты
-    columns = [name for name in cac_history.index.names if name not in ['dt']]
-    filtered_data = cac_history.pivot_table(
-        index='dt', columns=columns, values='cac', aggfunc='mean'
-    )
-    filter_data(filtered_data, window).plot(grid=True, ax=ax3)
+    plot_columns(smoothed['cac'], ax3)
     plt.xlabel('Дата привлечения')
     plt.title('Динамика стоимости привлечения пользователей')
 
     # четвёртый график — кривые roi
     ax4 = plt.subplot(2, 3, 4)
-    roi.T.plot(grid=True, ax=ax4)
+    plot_columns(roi.T, ax4)
     plt.axhline(y=1, color='red', linestyle='--', label='Уровень окупаемости')
     plt.legend()
     plt.xlabel('Лайфтайм')
@@ -97,12 +118,7 @@ def plot_ltv_roi(
 
     # пятый график — динамика roi
     ax5 = plt.subplot(2, 3, 5, sharey=ax4)
-    # столбцами сводной таблицы станут все столбцы индекса, кроме даты
-    columns = [name for name in roi_history.index.names if name not in ['dt']]
-    filtered_data = roi_history.pivot_table(
-        index='dt', columns=columns, values=horizon - 1, aggfunc='mean'
-    )
-    filter_data(filtered_data, window).plot(grid=True, ax=ax5)
+    plot_columns(smoothed['roi'], ax5)
     plt.axhline(y=1, color='red', linestyle='--', label='Уровень окупаемости')
     plt.xlabel('Дата привлечения')
     plt.title('Динамика ROI пользователей на {}-й день'.format(horizon))
@@ -1,6 +1,6 @@
 import matplotlib.pyplot as plt
 import pandas as pd
-from def_filter_data import filter_data
+from def_cohort_tables import set_line_labels
 
 def plot_retention(
     retention: pd.DataFrame,
@@ -31,15 +31,25 @@ def plot_retention(
     None
         Функция не возвращает значения. Вместо этого она отображает графики удержания пользователей и их динамики.
     """
-    # задаём размер сетки для графиков
-    plt.figure(figsize=(15, 10))
+    # функция рисует каждую строку таблицы отдельной линией по лайфтаймам
+    # одним вызовом ax.plot, без транспонирования таблицы
+    def plot_rows(data, ax):
+        set_line_labels(ax.plot(data.columns, data.to_numpy().T), data.index)
+        ax.grid(True)
 
-    # исключаем размеры когорт и удержание первого дня
-    retention = retention.drop(columns=['cohort_size', 0])
-    # в таблице динамики оставляем только нужный лайфтайм
-    retention_history = retention_history.drop(columns=['cohort_size'])[
-        [horizon - 1]
-    ]
+    # создаём сетку графиков одним вызовом: два столбца и две строки,
+    # четыре ячейки; вертикальная ось в каждой строке общая
+    fig, axes = plt.subplots(2, 2, figsize=(15, 10))
+    ax1, ax2, ax3, ax4 = axes.flat
+    ax2.sharey(ax1)
+    ax4.sharey(ax3)
+
+    # исключаем размеры когорт и удержание первого дня;
+    # доли удержания лежат от 0 до 1, для них точности float32 достаточно
+    retention = retention.drop(columns=['cohort_size', 0]).astype('float32')
+    # из таблицы динамики сразу берём только столбец нужного лайфтайма,
+    # не копируя таблицу целиком ради удаления размеров когорт
+    retention_history = retention_history[horizon - 1].astype('float32')
 
     # если в индексах таблицы удержания только payer,
     # добавляем второй признак — cohort
@@ -47,59 +57,83 @@ def plot_retention(
         retention['cohort'] = 'All users'
         retention = retention.reset_index().set_index(['cohort', 'payer'])
 
-    # в таблице графиков — два столбца и две строки, четыре ячейки
-    # в первой строим кривые удержания платящих пользователей
-    ax1 = plt.subplot(2, 2, 1)
-    retention.query('payer == True').droplevel('payer').T.plot(
-        grid=True, ax=ax1
-    )
-    plt.legend()
-    plt.xlabel('Лайфтайм')
-    plt.title('Удержание платящих пользователей')
+    # за один проход делим таблицу удержания на платящих и неплатящих
+    retention_by_payer = {
+        payer: data.droplevel('payer')
+        for payer, data in retention.groupby(level='payer')
+    }
+
+    # в первой ячейке строим кривые удержания платящих пользователей
+    plot_rows(retention_by_payer[True], ax1)
+    ax1.legend()
+    ax1.set_xlabel('Лайфтайм')
+    ax1.set_title('Удержание платящих пользователей')
 
     # во второй ячейке строим кривые удержания неплатящих
     # вертикальная ось — от графика из первой ячейки
-    ax2 = plt.subplot(2, 2, 2, sharey=ax1)
-    retention.query('payer == False').droplevel('payer').T.plot(
-        grid=True, ax=ax2
-    )
-    plt.legend()
-    plt.xlabel('Лайфтайм')
-    plt.title('Удержание неплатящих пользователей')
+    plot_rows(retention_by_payer[False], ax2)
+    ax2.legend()
+    ax2.set_xlabel('Лайфтайм')
+    ax2.set_title('Удержание неплатящих пользователей')
 
     # в третьей ячейке — динамика удержания платящих
-    ax3 = plt.subplot(2, 2, 3)
-    # получаем названия столбцов для сводной таблицы
-    columns = [
-        name
-        for name in retention_history.index.names
-        if name not in ['dt', 'payer']
-    ]
-    # фильтруем данные и строим график
-    filtered_data = retention_history.query('payer == True').pivot_table(
-        index='dt', columns=columns, values=horizon - 1, aggfunc='mean'
+    # получаем названия столбцов для сводной таблицы:
+    # все уровни индекса, кроме даты и payer, в исходном порядке; список
+    # считается один раз и общий для таблиц платящих и неплатящих
+    columns = (
+        pd.Index(retention_history.index.names)
+        .difference(['dt', 'payer'], sort=False)
+        .tolist()
     )
-    filter_data(filtered_data, window).plot(grid=True, ax=ax3)
-    plt.xlabel('Дата привлечения')
-    plt.title(
+    # одна развёрнутая таблица сразу для платящих и неплатящих:
+    # признак payer становится последним уровнем её столбцов
+    pivoted = retention_history.unstack(columns + ['payer'])
+
+    # функция выбора из сводной таблицы столбцов нужной группы пользователей
+    def select_payer(payer):
+        # без других признаков у таблицы один уровень столбцов — payer;
+        # возвращаем выбранному столбцу название лайфтайма
+        if not columns:
+            filtered_data = pivoted[payer].to_frame(horizon - 1)
+        else:
+            filtered_data = pivoted.xs(payer, level='payer', axis=1)
+        # даты и сочетания признаков, которые встречаются только
+        # у другой группы, в её отдельной сводной таблице не появились бы
+        return filtered_data.dropna(how='all').dropna(axis=1, how='all')
+
+    # фильтруем данные скользящим средним pandas: если даты привлечения
+    # у групп совпадают, сглаживаем обе таблицы за один проход,
+    # иначе окна скользящего среднего сместились бы
+    payers, non_payers = select_payer(True), select_payer(False)
+    if payers.index.equals(non_payers.index):
+        smoothed = (
+            pd.concat([payers, non_payers], axis=1, keys=['payers', 'non_payers'])
+            .rolling(window)
+            .mean()
+        )
+        payers, non_payers = smoothed['payers'], smoothed['non_payers']
+    else:
+        payers = payers.rolling(window).mean()
+        non_payers = non_payers.rolling(window).mean()
+
+    # строим график
+    payers.plot(grid=True, ax=ax3)
+    ax3.set_xlabel('Дата привлечения')
+    ax3.set_title(
         'Динамика удержания платящих пользователей на {}-й день'.format(
             horizon
         )
     )
 
     # в чётвертой ячейке — динамика удержания неплатящих
-    ax4 = plt.subplot(2, 2, 4, sharey=ax3)
-    # фильтруем данные и строим график
-    filtered_data = retention_history.query('payer == False').pivot_table(
-        index='dt', columns=columns, values=horizon - 1, aggfunc='mean'
-    )
-    filter_data(filtered_data, window).plot(grid=True, ax=ax4)
-    plt.xlabel('Дата привлечения')
-    plt.title(
+    # строим график
+    non_payers.plot(grid=True, ax=ax4)
+    ax4.set_xlabel('Дата привлечения')
+    ax4.set_title(
         'Динамика удержания неплатящих пользователей на {}-й день'.format(
             horizon
         )
     )
     
-    plt.tight_layout()
+    fig.tight_layout()
     plt.show()
\ No newline at end of file
@@ -1,26 +1,70 @@
 import re
 import json
+import pandas as pd
 
 # Функция для очистки названий населенных пунктов
-def clean_locality_type(name: str, type_pattern: dict) -> str:
+def clean_locality_type(name: str, type_pattern: tuple) -> str:
     """
     Функция, которая принимает название населенного пункта
     и возвращает стандартный тип населенного пункта на основе словаря сопоставлений.
 
     Параметры:
     name: str - Название населенного пункта.
-    type_pattern: dict - Словарь с шаблонами для сопоставления типов.
+    type_pattern: tuple - Объединённый шаблон и словарь типов для найденных шаблонов.
 
     Возвращает:
     str - Стандартный тип населенного пункта, если найдено совпадение, иначе 'undefined'.
     """
-    for pattern, locality_type in type_pattern.items():
-        if re.search(rf'\\b{pattern}\\b', name, re.IGNORECASE):
-            return locality_type
+    pattern, locality_types = type_pattern
+    # тип определяем по найденному в названии шаблону
+    match = pattern.search(name)
+    if match:
+        return locality_types[match.group().lower()]
     return 'undefined'
 
+# Функция для очистки названий населенных пунктов во всем столбце
+def clean_locality_types(names: pd.Series, type_pattern: tuple) -> pd.Series:
+    """
+    Векторный вариант clean_locality_type: возвращает стандартные типы
+    для всех названий населенных пунктов столбца за один проход.
+
+    Параметры:
+    names: pd.Series - Названия населенных пунктов.
+    type_pattern: tuple - Объединённый шаблон и словарь типов для найденных шаблонов.
+
+    Возвращает:
+    pd.Series - Категориальный столбец стандартных типов, 'undefined' там, где совпадений нет.
+    """
+    pattern, locality_types = type_pattern
+    # названия сильно повторяются, поэтому ищем совпадения
+    # только среди уникальных значений категориального столбца
+    names = names.astype('category')
+    categories = pd.Series(names.cat.categories)
+    # тип определяем по найденному в названии шаблону;
+    # в конец добавляем 'undefined' для пропусков в названиях
+    cleaned = pd.concat(
+        [
+            categories.str.extract(pattern, expand=False)
+            .str.lower()
+            .map(locality_types)
+            .fillna('undefined'),
+            pd.Series(['undefined']),
+        ],
+        ignore_index=True,
+    )
+    # разные названия дают один тип, поэтому заново нумеруем типы
+    # и переносим коды на строки; код пропуска -1 попадает на последний элемент
+    codes, types = pd.factorize(cleaned)
+    return pd.Series(
+        pd.Categorical.from_codes(
+            codes.take(names.cat.codes), types
+        ).remove_unused_categories(),
+        index=names.index,
+        name=names.name,
+    )
+
 # Загрузка данных из JSON-файла и создание словаря для обратного отображения
-def load_locality_type_map(json_path: str) -> dict:
+def load_locality_type_map(json_path: str) -> tuple:
     """
     Загрузка словаря сопоставлений типов населенных пунктов из JSON-файла
     и создание обратного отображения для замещения.
@@ -29,8 +73,45 @@ def load_locality_type_map(json_path: str) -> dict:
     json_path: str - Путь к JSON-файлу с данными.
 
     Возвращает:
-    dict - Словарь с обратным отображением шаблонов типов.
+    tuple - Объединённый скомпилированный шаблон и словарь с обратным отображением шаблонов типов.
     """
+    # функция собирает регулярное выражение из префиксного дерева шаблонов:
+    # шаблоны с общим началом разделяют его, и движок регулярных выражений
+    # проверяет общий префикс один раз, а не для каждого шаблона отдельно
+    def trie_to_regex(node):
+        alternatives = [
+            re.escape(char) + trie_to_regex(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        if not alternatives:
+            return ''
+        # шаблон может закончиться в этом узле — продолжение необязательно;
+        # жадный квантификатор сначала пробует более длинный шаблон
+        is_optional = '' in node
+        result = '|'.join(alternatives)
+        if len(alternatives) > 1 or (is_optional and len(result) > 1):
+            result = '(?:' + result + ')'
+        if is_optional:
+            result += '?'
+        return result
+
     with open(json_path, 'r', encoding='utf-8') as file:
         locality_type_map = json.load(file)
-    return {pattern: key for key, patterns in locality_type_map.items() for pattern in patterns}
+    type_pattern = {pattern.lower(): key for key, patterns in locality_type_map.items() for pattern in patterns}
+
+    # строим префиксное дерево шаблонов; пустой ключ отмечает конец шаблона
+    trie = {}
+    for key in type_pattern:
+        node = trie
+        for char in key:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    # без шаблонов пустая группа совпала бы с любым названием,
+    # поэтому берём никогда не совпадающий шаблон с той же группой
+    if not trie:
+        return re.compile(r'(?!)()'), type_pattern
+    # границы шаблона проверяем соседними символами, а не \b: шаблоны
+    # вроде 'пос.' заканчиваются точкой, после которой \b не срабатывает
+    pattern = re.compile(rf'(?<!\w)({trie_to_regex(trie)})(?!\w)', re.IGNORECASE)
+    return pattern, type_pattern
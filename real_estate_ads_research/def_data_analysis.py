@@ -21,16 +21,19 @@ def data_analysis(data: pd.DataFrame) -> pd.DataFrame:
     print(data.describe())
     print("\n")
     
-    # Вывод всех столбцов
+    # Вывод всех столбцов: строки ограничиваем первыми и последними,
+    # чтобы не форматировать в текст весь набор данных
     print("Все столбцы данных:")
-    print(data)
+    with pd.option_context('display.max_rows', 20, 'display.max_columns', None):
+        print(data)
     print("\n")
     
-    # Поиск и вывод дубликатов
-    duplicated_rows = data[data.duplicated()]
-    if not duplicated_rows.empty:
+    # Поиск и вывод дубликатов: отметки дубликатов считаем один раз,
+    # а сами строки выбираем, только если дубликаты есть
+    is_duplicated = data.duplicated()
+    if is_duplicated.any():
         print("Найдены дубликаты:")
-        print(duplicated_rows)
+        print(data[is_duplicated])
         print("\n")
     else:
         print("Дубликатов не найдено.")
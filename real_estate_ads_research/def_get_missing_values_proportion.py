@@ -1,6 +1,7 @@
 # Функция для вывода доли пропущенных значений в столбце
+# data - (DataFrame) Набор данных
 # column_name - (string) Название столбца
-def get_missing_values_proportion(column_name):
-    length = len(data.query(column_name + '.isnull()'))
+def get_missing_values_proportion(data, column_name):
+    length = data[column_name].isna().sum()
 
     print('Пропущенных значений - {} ({:.2%})'.format(length, length / len(data)), sep='')
\ No newline at end of file
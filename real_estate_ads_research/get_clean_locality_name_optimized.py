@@ -1,5 +1,25 @@
 import re
 import json
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# шаблон для разделения названия на тип и собственно название,
+# которое начинается с первой заглавной буквы
+LOCALITY_NAME_SPLIT = re.compile(r"^(.*?)([А-ЯЁ].*)$")
+
+# загрузка словаря типов населенных пунктов выполняется один раз,
+# повторные вызовы получают уже разобранный словарь
+@lru_cache(maxsize=1)
+def load_locality_type_mapping() -> dict:
+    """
+    Загружает словарь типов населенных пунктов из JSON файла.
+
+    Возвращает:
+    dict: Словарь сопоставлений типов населенных пунктов.
+    """
+    with open('locality_type_mapping.json', 'r', encoding='utf-8') as f:
+        return json.load(f)
 
 # функция для очистки названий населенных пунктов
 def get_clean_locality_name_optimized(name: str) -> str:
@@ -13,18 +33,68 @@ def get_clean_locality_name_optimized(name: str) -> str:
     str: Очищенное название населенного пункта.
     """
     
-    # Загрузка словаря типов населенных пунктов из JSON файла
-    with open('locality_type_mapping.json', 'r', encoding='utf-8') as f:
-        locality_type_mapping = json.load(f)
+    # Словарь типов населенных пунктов из JSON файла
+    locality_type_mapping = load_locality_type_mapping()
     
-    match = re.match(r"^(.*?)([А-ЯЁ].*)$", name.strip())
+    match = LOCALITY_NAME_SPLIT.match(name.strip())
     if match:
         locality_type, locality_name = match.groups()
         locality_type = locality_type.lower().strip()
         locality_name = locality_name.strip()
 
+        # ключи проверяем в порядке словаря: если в типе встречается
+        # несколько ключей, приоритет у того, что стоит в словаре раньше
         for key in locality_type_mapping.keys():
             if key in locality_type:
                 return locality_type_mapping[key] + ' ' + locality_name
 
     return name.strip()
+
+# функция для очистки названий населенных пунктов во всем столбце
+def get_clean_locality_names(names: pd.Series) -> pd.Series:
+    """
+    Векторный вариант get_clean_locality_name_optimized: очищает все названия
+    населенных пунктов столбца строковыми методами pandas без цикла по строкам.
+
+    Параметры:
+    names (pd.Series): Названия населенных пунктов.
+
+    Возвращает:
+    pd.Series: Категориальный столбец очищенных названий населенных пунктов.
+    """
+    locality_type_mapping = load_locality_type_mapping()
+
+    # названия сильно повторяются, поэтому очищаем
+    # только уникальные значения категориального столбца
+    categories = names.astype('category')
+    names = pd.Series(categories.cat.categories).str.strip()
+    # разделяем названия на тип и собственно название
+    parts = names.str.extract(LOCALITY_NAME_SPLIT)
+    parts.columns = ['type', 'name']
+    # находим ключ словаря в типе и заменяем его стандартным типом;
+    # np.select берёт первое выполненное условие, поэтому при нескольких
+    # ключах в типе приоритет у того, что стоит в словаре раньше
+    types = parts['type'].str.lower().str.strip()
+    locality_types = pd.Series(
+        np.select(
+            [
+                types.str.contains(key, regex=False, na=False)
+                for key in locality_type_mapping
+            ],
+            list(locality_type_mapping.values()),
+            default=None,
+        ),
+        index=types.index,
+    )
+    # там, где тип не найден, оставляем исходное название без пробелов по краям
+    cleaned = (locality_types + ' ' + parts['name'].str.strip()).fillna(names)
+    # разные исходные названия могут очиститься в одно, поэтому
+    # заново нумеруем очищенные значения и переносим коды на строки;
+    # код пропуска -1 попадает на добавленный в конец пропуск
+    codes, uniques = pd.factorize(cleaned)
+    codes = np.append(codes, -1).take(categories.cat.codes)
+    return pd.Series(
+        pd.Categorical.from_codes(codes, uniques),
+        index=categories.index,
+        name=categories.name,
+    )